@@ -15,84 +15,128 @@
 # along with CommandAlarm. If not, see <http://www.gnu.org/licenses/>.
 """CommandAlarm main module"""
 
-import argparse
 import datetime
-import errno
-import subprocess
+import os
+import sys
 import threading
 import time
+import types
 from . import __version__
 
-# pylint: disable=W0603
-ALARM_FIRED = False
+# Options that parse_simple_arguments handles without argparse. Flag
+# options map to their destination and value, the others take an
+# integer value.
+FLAG_OPTIONS = {
+    "-r": ("repeat", True),
+    "--repeat": ("repeat", True),
+    "-s": ("shell", True),
+    "--shell": ("shell", True),
+    "-n": ("check", False),
+    "--no-check": ("check", False),
+    "-c": ("capture", True),
+    "--capture": ("capture", True),
+}
+VALUE_OPTIONS = {
+    "-d": "day",
+    "--day": "day",
+    "-t": "timeout",
+    "--timeout": "timeout",
+}
 
+# The main thread waits on this event with a timeout until the alarm
+# goes off. The event is never set; it is only used to sleep.
+ALARM_EVENT = threading.Event()
 
-def alarm_handler():
-    """
-    Sets the global variable ALARM_FIRED to True.
 
-    This function is used as a callback for a threading.Timer object.
-    When the timer expires, it calls this function to set the
-    ALARM_FIRED flag.
-    """
-    global ALARM_FIRED
-    ALARM_FIRED = True
-
-
-def set_alarm(time_str, day):
+def set_alarm(time_obj, day, previous_alarm=None):
     """
     Set an alarm for a specific time and day of the week.
 
     Parameters:
-    time_str (str): The time in the format HH:MM:SS.
+    time_obj (datetime.time): The time of the alarm.
     day (int): The day of the week, where Monday is 1 and Sunday is 7.
+    previous_alarm (float): The time in seconds since the epoch of the
+                           alarm that went off before, if any. The new
+                           alarm is set after it even if the wait for it
+                           ended early by the wall clock.
 
     Returns:
-    threading.Timer: A Timer object that will execute the
-                    alarm_handler function after the specified time.
+    float: The number of seconds until the alarm goes off.
 
     Raises:
-    ValueError: If the time_str is not in the format HH:MM:SS
+    ValueError: If time_obj is not a datetime.time object
                or if day is not an integer between 1 and 7.
     """
-    try:
-        time_obj = datetime.datetime.strptime(time_str, "%H:%M:%S").time()
-    except ValueError as value_err:
-        raise ValueError(
-            "time_str must be in the format HH:MM:SS") from value_err
+    if not isinstance(time_obj, datetime.time):
+        raise ValueError("time_obj must be a datetime.time object")
     if not isinstance(day, int) or day < 1 or day > 7:
         raise ValueError("day must be an integer between 1 and 7")
-    date_obj = datetime.date.today()
-    days_ahead = day - date_obj.isoweekday()
-    if days_ahead < 0 or (days_ahead == 0
-                          and datetime.datetime.now().time() > time_obj):
+    now = time.time()
+    local_now = time.localtime(now)
+    alarm_hms = (time_obj.hour, time_obj.minute, time_obj.second)
+    days_ahead = day - (local_now.tm_wday + 1)
+    if days_ahead < 0 or (days_ahead == 0 and
+                          local_now[3:6] >= alarm_hms):
         days_ahead += 7
-    date_obj += datetime.timedelta(days=days_ahead)
-    alarm_datetime = datetime.datetime.combine(date_obj, time_obj)
-    seconds_until_alarm = (alarm_datetime -
-                           datetime.datetime.now()).total_seconds()
-    print(f"Alarm set for {alarm_datetime}")
-    return threading.Timer(seconds_until_alarm, alarm_handler)
+    while True:
+        # mktime normalizes a day of the month past the end of the month
+        # and works out daylight saving time when tm_isdst is -1.
+        alarm_time = time.mktime((local_now.tm_year, local_now.tm_mon,
+                                  local_now.tm_mday + days_ahead, *alarm_hms,
+                                  0, 0, -1))
+        if previous_alarm is None or alarm_time > previous_alarm:
+            break
+        days_ahead += 7
+    seconds_until_alarm = alarm_time - now
+    print("Alarm set for "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(alarm_time))}")
+    return seconds_until_alarm
+
+
+def parse_time(time_str):
+    """
+    Converts a time string to a time object.
+
+    The string is split by hand rather than with datetime.strptime,
+    which avoids the locale and regular expression machinery of
+    the _strptime module.
+
+    Parameters:
+    time_str (str): The time in the format HH:MM:SS.
+
+    Returns:
+    datetime.time: The time if the string is valid.
+
+    Raises:
+    ValueError: If the time string is not in the correct format.
+    """
+    fields = time_str.split(":")
+    if len(fields) != 3 or not all(
+            field.isdigit() and len(field) <= 2 for field in fields):
+        raise ValueError(f"invalid time string: {time_str}")
+    hour, minute, second = map(int, fields)
+    return datetime.time(hour, minute, second)
 
 
-def valid_time_string(time_str):
+def valid_time(time_str):
     """
-    Validates that the time string is in the correct format.
+    Validates that the time string is in the correct format and
+    converts it to a time object.
 
     Parameters:
     time_str (str): The time in the format HH:MM:SS.
 
     Returns:
-    str: The time string if it is valid.
+    datetime.time: The time if the string is valid.
 
     Raises:
     argparse.ArgumentTypeError: If the time string is not in the
                                correct format.
     """
     try:
-        datetime.datetime.strptime(time_str, "%H:%M:%S")
-        return time_str
+        return parse_time(time_str)
     except ValueError as value_err:
+        import argparse  # pylint: disable=import-outside-toplevel
         raise argparse.ArgumentTypeError(
             f"{time_str} is not a valid time in the format HH:MM:SS"
         ) from value_err
@@ -105,10 +149,11 @@ def create_parser():
     Returns:
     argparse.ArgumentParser() object.
     """
+    import argparse  # pylint: disable=import-outside-toplevel
     parser = argparse.ArgumentParser(
         prog="commandalarm", description="Set an alarm with a custom command.")
     parser.add_argument("time",
-                        type=valid_time_string,
+                        type=valid_time,
                         help="the time in the format HH:MM:SS")
     parser.add_argument("command", type=str, help="the command to run")
     parser.add_argument(
@@ -125,10 +170,10 @@ def create_parser():
     parser.add_argument(
         "-d",
         "--day",
-        default=datetime.date.today().isoweekday(),
+        default=None,
         type=int,
         help="the day of the week as an integer from 1 to 7",
-        choices=range(1, 8),
+        choices=(1, 2, 3, 4, 5, 6, 7),
     )
     parser.add_argument("-r",
                         "--repeat",
@@ -149,6 +194,13 @@ def create_parser():
         help="don't check the command exit code",
         dest="check",
     )
+    parser.add_argument(
+        "-c",
+        "--capture",
+        action="store_true",
+        default=False,
+        help="capture the command output and print it when it exits",
+    )
     parser.add_argument(
         "-t",
         "--timeout",
@@ -159,10 +211,148 @@ def create_parser():
     return parser
 
 
+def parse_simple_arguments(argv):
+    """
+    Parse the command-line arguments without argparse.
+
+    Only the known options and the positional arguments are handled,
+    in the same way as the parser from create_parser would handle them.
+
+    Parameters:
+    argv (list): The command-line arguments.
+
+    Returns:
+    types.SimpleNamespace: The parsed arguments, or None if the
+                          arguments must be parsed by argparse.
+    """
+    values = {
+        "day": None,
+        "repeat": False,
+        "shell": False,
+        "check": True,
+        "capture": False,
+        "timeout": None,
+    }
+    positionals = []
+    options_done = False
+    option_after_command = False
+    tokens = iter(argv)
+    for token in tokens:
+        if token == "--":
+            if options_done or len(positionals) > 1:
+                return None
+            options_done = True
+        elif options_done or not token.startswith("-"):
+            # argparse does not accept positional arguments after an
+            # option that follows the command.
+            if option_after_command:
+                return None
+            positionals.append(token)
+        elif token in FLAG_OPTIONS:
+            dest, value = FLAG_OPTIONS[token]
+            values[dest] = value
+            option_after_command = len(positionals) > 1
+        elif token in VALUE_OPTIONS:
+            value = next(tokens, "-")
+            if value.startswith("-"):
+                return None
+            try:
+                value = int(value)
+            except ValueError:
+                return None
+            dest = VALUE_OPTIONS[token]
+            if dest == "day" and not 1 <= value <= 7:
+                return None
+            values[dest] = value
+            option_after_command = len(positionals) > 1
+        else:
+            return None
+    if len(positionals) < 2:
+        return None
+    try:
+        values["time"] = parse_time(positionals[0])
+    except ValueError:
+        return None
+    values["command"] = positionals[1]
+    values["argument"] = positionals[2:]
+    return types.SimpleNamespace(**values)
+
+
+def parse_arguments(argv=None):
+    """
+    Parse the command-line arguments.
+
+    The common case is parsed by parse_simple_arguments, which avoids
+    importing argparse. Anything else, such as the help and version
+    options or invalid arguments, is parsed by the parser from
+    create_parser. The day defaults to today when it is not given.
+
+    Parameters:
+    argv (list): The command-line arguments, defaults to sys.argv[1:].
+
+    Returns:
+    argparse.Namespace or types.SimpleNamespace: The parsed arguments.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_simple_arguments(argv)
+    if args is None:
+        args = create_parser().parse_args(argv)
+    if args.day is None:
+        args.day = datetime.date.today().isoweekday()
+    return args
+
+
+def can_exec_command(args):
+    """
+    Check if the program can be replaced by the command with os.execvp.
+
+    Without repeat, the program has nothing left to do once the command
+    has run, so it can be replaced by the command when nothing else
+    needs the result of subprocess.run.
+
+    Parameters:
+    args (argparse.Namespace or types.SimpleNamespace): The parsed
+        arguments.
+
+    Returns:
+    bool: True if os.execvp can be used to run the command.
+    """
+    return (os.name == "posix" and not args.repeat and not args.shell
+            and not args.capture and args.check and args.timeout is None)
+
+
+def restore_signals():
+    """
+    Restore the signals that Python ignores to their default action.
+
+    Python ignores SIGPIPE and SIGXFSZ, and ignored signals stay ignored
+    across os.execvp. This does the same as the restore_signals option
+    of subprocess.run before the program is replaced by the command.
+    """
+    import signal  # pylint: disable=import-outside-toplevel
+    for name in ("SIGPIPE", "SIGXFSZ"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+
+
+def exit_program(status=0, message=None):
+    """
+    Print a message to stderr and exit, like argparse.ArgumentParser.exit.
+
+    Parameters:
+    status (int or str): The exit status passed to sys.exit.
+    message (str): The message to print, if any.
+    """
+    if message:
+        sys.stderr.write(message)
+    sys.exit(status)
+
+
 def main():
     """
-    The main function sets a threading timer and runs a command when
-    the timer goes off.
+    The main function sets an alarm and runs a command when the alarm
+    goes off.
 
     Exit Codes:
     - errno.ENOENT: The command was not found.
@@ -170,68 +360,69 @@ def main():
     - errno.ETIME: The command timed out.
     - Non-zero: The same exit code is used as the command if it exits
                with a non-zero code unless the --no-check option is used.
+               When the program is replaced by the command with os.execvp
+               (no --repeat, --shell, --capture, --no-check or --timeout
+               option on a POSIX system), no "Command exited with status
+               code" message is printed.
     - 1: If none of the above errors have occurred, then a runtime
         error, a value error, or a keyboard interrupt occurred.
     """
-    global ALARM_FIRED
-    parser = create_parser()
-    args = parser.parse_args()
+    # pylint: disable=import-outside-toplevel
+    import errno
+    import subprocess
+    args = parse_arguments()
+    argv = [args.command, *args.argument]
+    command_str = " ".join(argv)
+    command = command_str if args.shell else argv
+    exec_command = can_exec_command(args)
+    run_kwargs = {
+        "capture_output": args.capture,
+        "shell": args.shell,
+        "timeout": args.timeout,
+        "check": args.check,
+        "text": True,
+    }
     try:
-        timer = set_alarm(args.time, args.day)
-        timer.start()
+        seconds_until_alarm = set_alarm(args.time, args.day)
         while True:
-            while not ALARM_FIRED:
-                try:
-                    timer.join()
-                except RuntimeError:
-                    parser.exit("Error: Could not join timer thread")
-            command_str = (f"{args.command} {' '.join(args.argument)}"
-                           if args.argument else args.command)
-            command = command_str if args.shell else [args.command
-                                                      ] + args.argument
+            alarm_time = time.time() + seconds_until_alarm
+            ALARM_EVENT.wait(timeout=seconds_until_alarm)
             print("Running command:", command_str)
             try:
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    shell=args.shell,
-                    timeout=args.timeout,
-                    check=args.check,
-                    text=True,
-                )
+                if exec_command:
+                    sys.stdout.flush()
+                    restore_signals()
+                    os.execvp(args.command, argv)
+                result = subprocess.run(command, **run_kwargs)
             except FileNotFoundError:
-                parser.exit(errno.ENOENT, "Command not found")
+                exit_program(errno.ENOENT, "Command not found")
             except subprocess.CalledProcessError as called_process_err:
-                parser.exit(
-                    called_process_err.returncode,
-                    f"Command exited with status code "
-                    f"{called_process_err.returncode}: "
-                    f"{called_process_err.stderr}",
-                )
+                message = (f"Command exited with status code "
+                           f"{called_process_err.returncode}")
+                if args.capture:
+                    message += f": {called_process_err.stderr}"
+                exit_program(called_process_err.returncode, message)
             except PermissionError as permission_err:
-                parser.exit(errno.EACCES,
-                            f"Permission error: {permission_err}")
+                exit_program(errno.EACCES,
+                             f"Permission error: {permission_err}")
             except subprocess.TimeoutExpired as timeout_expired:
-                parser.exit(
+                exit_program(
                     errno.ETIME,
                     f"Command timed out after "
                     f"{timeout_expired.timeout} seconds",
                 )
             else:
-                print(result.stdout)
+                if args.capture:
+                    print(result.stdout)
             if args.repeat:
-                ALARM_FIRED = False
-                time.sleep(1)
-                timer = set_alarm(args.time, args.day)
-                timer.start()
+                seconds_until_alarm = set_alarm(args.time, args.day,
+                                                alarm_time)
             else:
                 break
     except (NameError, TypeError, ValueError, AttributeError) as exception:
-        parser.exit(f"Unable to set the alarm: {exception}")
+        exit_program(f"Unable to set the alarm: {exception}")
     except KeyboardInterrupt:
-        timer.cancel()
-        timer.join()
-        parser.exit("Alarm stopped manually.")
+        exit_program("Alarm stopped manually.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""Tests for the commandalarm module"""
+
+import datetime
+import errno
+import os
+import time
+import unittest
+from unittest import mock
+
+from commandalarm import commandalarm
+from commandalarm.commandalarm import (can_exec_command, create_parser,
+                                       parse_arguments, parse_simple_arguments,
+                                       set_alarm)
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "time.tzset is not available")
+class TestSetAlarm(unittest.TestCase):
+    """Tests for the function set_alarm."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"TZ": "Europe/Stockholm"})
+        patcher.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patcher.stop)
+        time.tzset()
+        # Monday 2023-06-26 12:00:00
+        self.now = time.mktime((2023, 6, 26, 12, 0, 0, 0, 0, -1))
+        self.day = 1
+
+    def seconds_until_alarm(self, now, time_obj, day):
+        """Return the seconds until the alarm set at the local time now."""
+        with mock.patch("time.time",
+                        return_value=time.mktime((*now, 0, 0, -1))):
+            return set_alarm(time_obj, day)
+
+    def test_alarm_now_is_set_for_next_week(self):
+        """An alarm for the current time is set for next week."""
+        with mock.patch("time.time", return_value=self.now):
+            seconds_until_alarm = set_alarm(datetime.time(12, 0, 0), self.day)
+        self.assertEqual(seconds_until_alarm, 7 * 86400)
+
+    def test_alarm_after_early_wake_is_set_for_next_week(self):
+        """An alarm set again just before the wall clock reaches the
+        previous alarm is set for next week."""
+        with mock.patch("time.time", return_value=self.now - 0.001):
+            seconds_until_alarm = set_alarm(datetime.time(12, 0, 0),
+                                            self.day, self.now)
+        self.assertAlmostEqual(seconds_until_alarm, 7 * 86400 + 0.001,
+                               places=3)
+
+    def test_alarm_one_second_later_is_set_for_today(self):
+        """An alarm for one second after the current time is set for
+        today."""
+        with mock.patch("time.time", return_value=self.now):
+            seconds_until_alarm = set_alarm(datetime.time(12, 0, 1), self.day)
+        self.assertEqual(seconds_until_alarm, 1)
+
+    def test_alarm_earlier_weekday_is_set_for_next_week(self):
+        """An alarm for an earlier day of the week is set for next
+        week."""
+        # Wednesday 2023-06-28 to Monday 2023-07-03
+        self.assertEqual(
+            self.seconds_until_alarm((2023, 6, 28, 12, 0, 0),
+                                     datetime.time(12, 0, 0), 1), 5 * 86400)
+
+    def test_alarm_in_next_month(self):
+        """An alarm past the end of the month is set in the next month."""
+        # Wednesday 2023-05-31 to Friday 2023-06-02
+        self.assertEqual(
+            self.seconds_until_alarm((2023, 5, 31, 12, 0, 0),
+                                     datetime.time(12, 0, 0), 5), 2 * 86400)
+
+    def test_alarm_across_daylight_saving_time_change(self):
+        """An alarm after daylight saving time ends is set for the local
+        time."""
+        # Friday 2023-10-27 to Monday 2023-10-30, the clocks go back on
+        # Sunday 2023-10-29.
+        self.assertEqual(
+            self.seconds_until_alarm((2023, 10, 27, 12, 0, 0),
+                                     datetime.time(12, 0, 0), 1), 73 * 3600)
+
+
+class TestParseSimpleArguments(unittest.TestCase):
+    """Tests for the function parse_simple_arguments."""
+
+    def test_same_as_argparse(self):
+        """Arguments that are parsed without argparse give the same
+        result as argparse."""
+        for argv in [
+            ["12:00:00", "ls"],
+            ["12:00:00", "ls", "a", "b"],
+            ["-r", "12:00:00", "ls", "a"],
+            ["12:00:00", "-s", "ls", "a"],
+            ["12:00:00", "ls", "a", "-n"],
+            ["12:00:00", "ls", "-c"],
+            ["-c", "12:00:00", "-r", "ls", "a", "-s", "-n"],
+            ["--repeat", "--shell", "--no-check", "--capture", "1:2:3", "ls"],
+            ["--", "12:00:00", "ls", "-r", "a"],
+            ["12:00:00", "--", "ls", "-r", "--day", "3"],
+            ["-r", "12:00:00", "--", "ls", "-a"],
+            ["-d", "3", "12:00:00", "ls"],
+            ["12:00:00", "--day", "7", "ls", "a"],
+            ["12:00:00", "ls", "a", "-t", "5"],
+            ["--timeout", "30", "12:00:00", "ls"],
+            ["-d", "1", "-d", "2", "12:00:00", "ls"],
+            ["-t", "1", "12:00:00", "ls", "-t", "2", "-r", "-r"],
+        ]:
+            with self.subTest(argv=argv):
+                args = parse_simple_arguments(argv)
+                self.assertIsNotNone(args)
+                self.assertEqual(vars(args),
+                                 vars(create_parser().parse_args(argv)))
+
+    def test_left_to_argparse(self):
+        """Arguments that argparse must handle give None."""
+        for argv in [
+            ["12:00:00", "ls", "-r", "a"],
+            ["12:00:00", "ls", "--", "a"],
+            ["12:00:00", "ls", "-t"],
+            ["-t5", "12:00:00", "ls"],
+            ["--timeout=5", "12:00:00", "ls"],
+            ["-rs", "12:00:00", "ls"],
+            ["--rep", "12:00:00", "ls"],
+            ["-d", "8", "12:00:00", "ls"],
+            ["-h"],
+            ["-v"],
+            ["12:00:00", "ls", "-h"],
+            ["12:00:00", "ls", "-v"],
+            ["12:00", "ls"],
+            ["24:00:00", "ls"],
+            ["12:00:0a", "ls"],
+            ["12:00:00"],
+        ]:
+            with self.subTest(argv=argv):
+                self.assertIsNone(parse_simple_arguments(argv))
+
+
+
+@unittest.skipUnless(os.name == "posix", "os.execvp is only used on POSIX")
+class TestMain(unittest.TestCase):
+    """Tests for how the function main runs the command."""
+
+    def run_main(self, argv):
+        """Run main with the alarm going off at once and return the
+        mocks for os.execvp, subprocess.run and restore_signals."""
+        manager = mock.Mock()
+        with mock.patch("sys.argv", ["commandalarm", *argv]), \
+                mock.patch.object(commandalarm, "set_alarm",
+                                  side_effect=[0, KeyboardInterrupt]), \
+                mock.patch.object(commandalarm, "ALARM_EVENT"), \
+                mock.patch.object(commandalarm, "restore_signals",
+                                  manager.restore_signals), \
+                mock.patch("os.execvp", manager.execvp), \
+                mock.patch("subprocess.run", manager.run), \
+                mock.patch("sys.stdout"), mock.patch("sys.stderr"):
+            try:
+                commandalarm.main()
+            except SystemExit:
+                pass
+        return manager
+
+    def test_exec(self):
+        """Without options the program is replaced by the command after
+        the signals are restored."""
+        self.assertTrue(
+            can_exec_command(parse_arguments(["12:00:00", "ls", "a"])))
+        manager = self.run_main(["12:00:00", "ls", "a"])
+        self.assertEqual(manager.mock_calls[:2], [
+            mock.call.restore_signals(),
+            mock.call.execvp("ls", ["ls", "a"]),
+        ])
+
+    def test_subprocess_run(self):
+        """Each of the options repeat, shell, capture, no-check and timeout
+        runs the command with subprocess.run."""
+        for option in [["-r"], ["-s"], ["-c"], ["-n"], ["-t", "5"]]:
+            argv = [*option, "12:00:00", "ls"]
+            with self.subTest(argv=argv):
+                self.assertFalse(can_exec_command(parse_arguments(argv)))
+                manager = self.run_main(argv)
+                manager.execvp.assert_not_called()
+                manager.restore_signals.assert_not_called()
+                manager.run.assert_called_once()
+
+    def test_exec_errors(self):
+        """Errors from os.execvp exit with the same codes as errors from
+        subprocess.run."""
+        for error, status in [(FileNotFoundError, errno.ENOENT),
+                              (PermissionError, errno.EACCES)]:
+            with self.subTest(error=error), \
+                    mock.patch("sys.argv", ["commandalarm", "1:2:3", "ls"]), \
+                    mock.patch.object(commandalarm, "set_alarm",
+                                      return_value=0), \
+                    mock.patch.object(commandalarm, "ALARM_EVENT"), \
+                    mock.patch.object(commandalarm, "restore_signals"), \
+                    mock.patch("os.execvp", side_effect=error), \
+                    mock.patch("subprocess.run") as run, \
+                    mock.patch("sys.stdout"), mock.patch("sys.stderr"), \
+                    self.assertRaises(SystemExit) as context:
+                commandalarm.main()
+            self.assertEqual(context.exception.code, status)
+            run.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()